@@ -0,0 +1,139 @@
+import os
+import json
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytz
+import requests
+from requests.adapters import HTTPAdapter
+
+from common_dataclasses import LoginRequest, LoginResult
+
+
+# файл кэша токена по умолчанию
+default_cache_path = os.path.join(os.path.expanduser('~'), '.arrival_pinger_session.json')
+# время жизни токена в кэше по умолчанию
+default_token_ttl = timedelta(hours=12)
+# таймаут запроса логина по умолчанию, с
+default_login_timeout_s = 60
+# коды HTTP, после которых токен считается недействительным
+auth_error_status_codes = (401, 403)
+
+
+class AuthError(Exception):
+    pass
+
+
+class ApiSession:
+    """
+    Клиентская сессия API-сервера: выполняет логин один раз, хранит токен на диске с ограниченным сроком
+    жизни, обновляет его при ошибке авторизации и использует один пул соединений для всех конечных точек
+    """
+
+    def __init__(self, url_login: str, login: str, password: str, cache_path: str = default_cache_path,
+                 token_ttl: timedelta = default_token_ttl, pool_size: int = 10,
+                 login_timeout_s: float = default_login_timeout_s):
+        self.url_login = url_login
+        self.login = login
+        self.password = password
+        self.cache_path = cache_path
+        self.token_ttl = token_ttl
+        self.login_timeout_s = login_timeout_s
+        self.token: Optional[str] = None
+        self.expires_at: Optional[datetime] = None
+
+        self.session = requests.Session()
+        self.session.verify = False
+        self.session.headers.update({'Content-type': 'application/json'})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._load_cached_token()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _cache_key(self) -> str:
+        return f'{self.login}@{self.url_login}'
+
+    def _read_cache(self) -> dict:
+        try:
+            with open(self.cache_path, encoding='utf-8') as file:
+                cache = json.load(file)
+        except (OSError, ValueError):
+            return {}
+        return cache if isinstance(cache, dict) else {}
+
+    def _load_cached_token(self) -> None:
+        # поврежденная или устаревшая по формату запись кэша считается отсутствующей
+        try:
+            entry = self._read_cache()[self._cache_key()]
+            token = entry['token']
+            expires_at = datetime.fromisoformat(entry['expires_at'])
+            is_valid = isinstance(token, str) and expires_at > datetime.now(pytz.utc)
+        except (KeyError, TypeError, ValueError):
+            return
+        if is_valid:
+            self.token = token
+            self.expires_at = expires_at
+
+    def _save_cached_token(self) -> None:
+        cache = self._read_cache()
+        cache[self._cache_key()] = {'token': self.token, 'expires_at': self.expires_at.isoformat()}
+        # токен дает доступ к API, поэтому файл доступен только владельцу
+        fd = os.open(self.cache_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump(cache, file, indent=4)
+
+    def _is_token_valid(self) -> bool:
+        return self.token is not None and self.expires_at > datetime.now(pytz.utc)
+
+    def authenticate(self) -> None:
+        """
+        Выполняет логин с новым токеном и сохраняет его в кэш
+        """
+        token = str(uuid.uuid4())
+        params = LoginRequest(token=token, login=self.login, password=self.password)
+        response = self.session.post(self.url_login, data=params.json(), timeout=self.login_timeout_s)
+        if response.status_code != 200:
+            raise AuthError(f'Ошибка логина пользователя "{self.login}": HTTP {response.status_code}')
+        try:
+            result = LoginResult.parse_obj(response.json())
+        except ValueError:
+            raise AuthError(f'Ошибка логина пользователя "{self.login}": некорректный ответ сервера')
+        if result.user is None:
+            raise AuthError(f'Ошибка логина пользователя "{self.login}": {result.errors}')
+
+        self.token = token
+        self.expires_at = datetime.now(pytz.utc) + self.token_ttl
+        self._save_cached_token()
+
+    def ensure_token(self) -> str:
+        """
+        Возвращает действующий токен, при необходимости выполняя логин
+        """
+        if not self._is_token_valid():
+            self.authenticate()
+        return self.token
+
+    def post(self, url: str, params: dict, **kwargs) -> requests.Response:
+        """
+        Посылает запрос params на url, подставляя актуальный токен; kwargs передаются в requests.
+        При ошибке авторизации (HTTP 401/403) выполняет повторный логин и повторяет запрос один раз.
+        Тело ответа не разбирается: текст ошибок в поле errors не позволяет надежно отличить
+        недействительный токен от прочих ошибок, а повтор неидемпотентного запроса недопустим
+        """
+        response = self.session.post(url, data=json.dumps(dict(params, token=self.ensure_token())), **kwargs)
+        if response.status_code in auth_error_status_codes:
+            response.close()
+            self.authenticate()
+            response = self.session.post(url, data=json.dumps(dict(params, token=self.token)), **kwargs)
+        return response
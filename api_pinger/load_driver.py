@@ -0,0 +1,209 @@
+import json
+import math
+import os
+import time
+import queue
+import threading
+import multiprocessing
+from collections import Counter
+from typing import Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from api_pinger.pinger import api_session, url_do_stretch, params_do_stretch, headers
+from api_pinger.client_session import ApiSession
+
+
+# число корзин гистограммы задержек на декаду (логарифмическая шкала)
+histogram_buckets_per_decade = 20
+# период опроса очереди результатов рабочих процессов, с
+result_poll_interval_s = 1
+
+
+def latency_to_bucket(latency_ms: float) -> int:
+    """
+    Возвращает номер корзины гистограммы для задержки latency_ms
+    """
+    return math.ceil(histogram_buckets_per_decade * math.log10(max(latency_ms, 1e-3)))
+
+
+def _bucket_to_latency(bucket: int) -> float:
+    """
+    Возвращает верхнюю границу корзины гистограммы, мс
+    """
+    return 10 ** (bucket / histogram_buckets_per_decade)
+
+
+def _worker(url: str, body: str, rate: float, duration_s: float, pool_size: int,
+            result_queue: multiprocessing.Queue) -> None:
+    """
+    Рабочий процесс: посылает запросы по расписанию с частотой rate (запросов/с) в течение duration_s секунд,
+    держа в обработке до pool_size запросов одновременно через собственный пул соединений,
+    и отправляет гистограмму задержек и счетчик ошибок в result_queue
+    """
+    histogram = Counter()
+    errors = Counter()
+    counters = {'intended': 0, 'sent': 0}
+    lock = threading.Lock()
+    start = time.perf_counter()
+
+    def _sender(session: requests.Session) -> None:
+        # открытая модель нагрузки: время отправки задается расписанием, а не ответом сервера.
+        # Задержка отсчитывается от запланированного момента отправки, поэтому время ожидания
+        # свободного соединения входит в нее (без этого перегрузка сервера маскируется)
+        while True:
+            with lock:
+                scheduled_time = start + counters['intended'] * interval
+                if scheduled_time - start >= duration_s or time.perf_counter() - start >= duration_s:
+                    return
+                counters['intended'] += 1
+            delay = scheduled_time - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+
+            latency_ms = None
+            error = None
+            try:
+                response = session.post(url, verify=False, data=body, headers=headers)
+                latency_ms = (time.perf_counter() - scheduled_time) * 1000
+                if response.status_code != 200:
+                    error = f'HTTP {response.status_code}'
+                elif response.json().get('errors'):
+                    error = 'Ошибка в ответе сервера'
+            except requests.RequestException as exc:
+                error = type(exc).__name__
+            except (ValueError, AttributeError):
+                error = 'Некорректный ответ сервера'
+
+            with lock:
+                counters['sent'] += 1
+                if latency_ms is not None:
+                    histogram[latency_to_bucket(latency_ms)] += 1
+                if error is not None:
+                    errors[error] += 1
+
+    interval = 1 / rate if rate > 0 else 0
+    session = requests.Session()
+    try:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        senders = [threading.Thread(target=_sender, args=(session,), daemon=True) for _ in range(pool_size)]
+        for sender in senders:
+            sender.start()
+        for sender in senders:
+            sender.join()
+    finally:
+        session.close()
+        # запланированные, но не отправленные из-за занятости всех соединений запросы
+        # считаются отставанием от целевой частоты
+        intended = max(counters['intended'], math.floor(duration_s * rate))
+        result_queue.put({'intended': intended,
+                          'sent': counters['sent'],
+                          'elapsed_s': time.perf_counter() - start,
+                          'histogram': dict(histogram),
+                          'errors': dict(errors)})
+
+
+def _percentile(histogram: Counter, fraction: float) -> Optional[float]:
+    """
+    Возвращает оценку сверху для перцентиля fraction (0..1) по гистограмме задержек, мс
+    """
+    total = sum(histogram.values())
+    if total == 0:
+        return None
+    threshold = fraction * total
+    accumulated = 0
+    for bucket in sorted(histogram):
+        accumulated += histogram[bucket]
+        if accumulated >= threshold:
+            return _bucket_to_latency(bucket)
+
+
+def merge_results(results: list) -> dict:
+    """
+    Объединяет результаты рабочих процессов в единый отчет
+    """
+    histogram = Counter()
+    errors = Counter()
+    intended = 0
+    sent = 0
+    elapsed_s = 0.0
+    for result in results:
+        histogram.update({int(bucket): count for bucket, count in result['histogram'].items()})
+        errors.update(result['errors'])
+        intended += result.get('intended', result['sent'])
+        sent += result['sent']
+        elapsed_s = max(elapsed_s, result['elapsed_s'])
+
+    return {'intended': intended,
+            'sent': sent,
+            # запросы, которые не удалось отправить по расписанию
+            'missed': intended - sent,
+            'received': sum(histogram.values()),
+            'elapsed_s': elapsed_s,
+            'throughput_rps': sent / elapsed_s if elapsed_s else 0.0,
+            'latency_ms': {f'p{round(fraction * 100, 1):g}': _percentile(histogram, fraction)
+                           for fraction in (0.5, 0.9, 0.99, 0.999)},
+            'histogram': dict(sorted(histogram.items())),
+            'errors': dict(errors)}
+
+
+def drive_load(url: str, params: dict, target_rate: float, duration_s: float, session: ApiSession,
+               processes: Optional[int] = None, pool_size: int = 10) -> dict:
+    """
+    Нагружает API-сервер запросами params на url с суммарной частотой target_rate (запросов/с)
+    в течение duration_s секунд, распределяя нагрузку по processes рабочим процессам
+    (по умолчанию - по числу ядер клиента), каждый из которых держит до pool_size запросов в обработке.
+    Логин выполняется один раз через session, рабочие процессы используют полученный токен.
+    Возвращает объединенный отчет, включая отставание достигнутой частоты от целевой
+    """
+    processes = processes or os.cpu_count() or 1
+    # сериализация выполняется один раз, чтобы не тратить на нее процессорное время рабочих процессов
+    body = json.dumps(dict(params, token=session.ensure_token()))
+    rate_share = target_rate / processes
+
+    result_queue = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=_worker,
+                                       args=(url, body, rate_share, duration_s, pool_size, result_queue))
+               for _ in range(processes)]
+    for worker in workers:
+        worker.start()
+    # очередь вычитывается до join, чтобы рабочие процессы не блокировались на отправке результатов;
+    # аварийно завершившийся рабочий процесс не должен блокировать построение отчета
+    results = []
+    while len(results) < len(workers):
+        try:
+            results.append(result_queue.get(timeout=result_poll_interval_s))
+        except queue.Empty:
+            if all(worker.exitcode is not None for worker in workers):
+                try:
+                    while len(results) < len(workers):
+                        results.append(result_queue.get(timeout=result_poll_interval_s))
+                except queue.Empty:
+                    pass
+                break
+    for worker in workers:
+        worker.join()
+
+    report = merge_results(results)
+    report['processes'] = processes
+    report['failed_processes'] = processes - len(results)
+    report['target_rate_rps'] = target_rate
+    # новые запросы отправляются только в течение duration_s, поэтому частота отправки считается по нему
+    report['achieved_rate_rps'] = report['sent'] / duration_s if duration_s else 0.0
+    report['rate_shortfall_percent'] = (100 * max(target_rate - report['achieved_rate_rps'], 0) / target_rate
+                                        if target_rate else 0.0)
+    return report
+
+
+def print_report(report: dict) -> None:
+    print('Отчет о нагрузочном тестировании:')
+    print(json.dumps(report, sort_keys=False, indent=4, ensure_ascii=False))
+
+
+if __name__ == '__main__':
+    params = dict(params_do_stretch, is_multiprocess_mode=True)
+    print_report(drive_load(url_do_stretch, params, target_rate=10, duration_s=60, session=api_session,
+                            pool_size=50))
@@ -1,10 +1,11 @@
-import requests
 import json
 import urllib3
 from funnydeco import benchmark
 from datetime import datetime
 import pytz
 
+from api_pinger.client_session import ApiSession
+
 
 urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 
@@ -27,13 +28,14 @@ url_num_sbros = f'{host}/api/v1/num_sbros.json'
 url_export = f'{host}/api/v1/export.json'
 url_follow_the_sun = f'{host}/api/v1/follow_the_sun.json'
 url_glue_stretch = f'{host}/api/v1/glue_stretch.json'
+url_do_stretch_stream = f'{host}/api/v1/do_stretch_stream.json'
 url_settings = f'{host}/api/v1/settings.json'
 
 
 headers = {'Content-type': 'application/json'}
 
 
-token = '84980637-164d-4571-a3a2-c0e1216547ac'
+# токен в params_* не задается: ApiSession подставляет полученный при логине
 
 
 params_dummy = {
@@ -42,20 +44,20 @@ params_dummy = {
                 }
 
 params_login = {
-                    "token": token,
                     "login": "vlakir",
                     "password": "123456789",
                 }
 
+# общая сессия: логин выполняется один раз, токен кэшируется на диске, соединения переиспользуются
+api_session = ApiSession(url_login, params_login['login'], params_login['password'])
+
 
 params_stretches = {
-                    "token": token,
                     "user_id": 1,
                     # "filter_imported": True
                     }
 
 params_stretch_edit = {
-                        "token": token,
                         "stretch": {
                             "stretch_id": 1,
                             "name": "Тестовая протяжка",
@@ -67,22 +69,18 @@ params_stretch_edit = {
                       }
 
 params_stretch_delete = {
-                        "token": token,
                         "stretch_id": 0
                         }
 
 params_frames = {
-                    "token": token,
                 }
 
 params_sbis = {
-                    "token": token,
                     "stretch_id": 2353,
               }
 
 
 params_do_stretch = {
-                        "token": token,
                         "stretch": {
                             "name": "Протяжка из pinger 21",
                             "space_object_id": 1,
@@ -109,31 +107,25 @@ params_do_stretch = {
                    }
 
 params_space_objects = {
-                            "token": token,
                        }
 
 params_user = {
-                    "token": token,
                     "user_id": 1
                 }
 
 params_import = {
-                    "token": token,
                     "user_id": 1,
                     "num_sbros": 14799
                 }
 
 params_num_sbros = {
-                        "token": token,
                    }
 
 params_export = {
-                    "token": token,
                     "stretch_id": 1
                 }
 
 params_follow_the_sun = {
-                            "token": token,
                             "status_vector_sat_ascending_node": {
                                 "x": 4951.209053138 * 1000,
                                 "y": -4653.856628012 * 1000,
@@ -149,7 +141,6 @@ params_follow_the_sun = {
 
 
 params_glue_stretch = {
-                        "token": token,
                         "stretch_id": 419,
                         "period": 15 * 93 * 60,
                         "timestep": 60,
@@ -158,7 +149,6 @@ params_glue_stretch = {
                       }
 
 # params_settings = {
-#                         "token": token,
 #                         "settings": {
 #                             "logging_level": "DEBUG",
 #                             "max_log_files_size_mb": 10,
@@ -183,7 +173,6 @@ params_glue_stretch = {
 #                       }
 
 params_settings = {
-                        "token": token,
                         "settings": None
                       }
 
@@ -191,7 +180,7 @@ params_settings = {
 # noinspection PyUnusedLocal
 @benchmark
 def requester(url: str, params: dict, print_benchmark=False, benchmark_name='') -> None:
-    response = requests.post(url, verify=False, data=json.dumps(params), headers=headers)
+    response = api_session.post(url, params)
     print('Ответ сервера:')
     print(f'Статус - {response.status_code}')
     print(json.dumps(response.json(), sort_keys=False, indent=4, ensure_ascii=False))
@@ -0,0 +1,65 @@
+from typing import Optional, List
+
+from common_dataclasses import SbisRequest, SbisResult, StandardBallisticInformation
+from api_pinger.pinger import url_sbis
+from api_pinger.client_session import ApiSession
+
+
+def _has_sbis_without_id(sbis: List[StandardBallisticInformation]) -> bool:
+    return any(sbi.status_vector.status_vector_id is None for sbi in sbis)
+
+
+class SbisLocalCopy:
+    """
+    Локальная копия СБИ протяжки, обновляемая инкрементально по версии
+    """
+
+    def __init__(self, stretch_id: int):
+        self.stretch_id = stretch_id
+        self.version: Optional[int] = None
+        self.sbis: List[StandardBallisticInformation] = []
+
+    def merge(self, result: SbisResult) -> None:
+        """
+        Применяет ответ на запрос СБИ: полный список заменяет копию, дельта - удаляет,
+        заменяет и добавляет СБИ по идентификатору вектора состояния.
+        Дельту нельзя применить, если у СБИ в ней или в копии нет идентификатора: такие СБИ невозможно
+        сопоставить, в этом случае выбрасывается ValueError и нужен полный запрос
+        """
+        if not result.is_delta:
+            self.sbis = list(result.sbis)
+        elif _has_sbis_without_id(result.sbis) or _has_sbis_without_id(self.sbis):
+            raise ValueError(f'Дельта СБИ протяжки {self.stretch_id} содержит СБИ без идентификатора')
+        else:
+            deleted_ids = set(result.deleted_status_vector_ids or [])
+            changed = {sbi.status_vector.status_vector_id: sbi for sbi in result.sbis}
+            merged = [changed.pop(sbi.status_vector.status_vector_id, sbi) for sbi in self.sbis
+                      if sbi.status_vector.status_vector_id not in deleted_ids]
+            merged.extend(changed.values())
+            # при склейке новые СБИ дописываются в конец, поэтому сортировка обычно почти ничего не меняет
+            merged.sort(key=lambda sbi: sbi.status_vector.time)
+            self.sbis = merged
+        self.version = result.version
+
+    def refresh(self, api_session: ApiSession) -> SbisResult:
+        """
+        Запрашивает изменения СБИ после известной версии и применяет их к копии.
+        Если дельту применить нельзя, запрашивает полный список СБИ
+        """
+        # копию с СБИ без идентификатора инкрементально обновить нельзя
+        since_version = None if _has_sbis_without_id(self.sbis) else self.version
+        result = self._request(api_session, since_version)
+        if not result.errors:
+            try:
+                self.merge(result)
+            except ValueError:
+                result = self._request(api_session, None)
+                if not result.errors:
+                    self.merge(result)
+        return result
+
+    def _request(self, api_session: ApiSession, since_version: Optional[int]) -> SbisResult:
+        params = SbisRequest(token=api_session.ensure_token(), stretch_id=self.stretch_id,
+                             since_version=since_version)
+        response = api_session.post(url_sbis, params.dict())
+        return SbisResult.parse_obj(response.json())
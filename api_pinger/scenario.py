@@ -0,0 +1,230 @@
+import json
+import random
+import threading
+import time
+import argparse
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Dict
+
+import pytz
+import requests
+from requests.adapters import HTTPAdapter
+from pydantic import BaseModel, ValidationError, conlist, validator, NonNegativeFloat
+
+from common_dataclasses import LoginRequest, StretchesRequest, StretchEditRequest, StretchDeleteRequest, \
+    FramesRequest, SbisRequest, DoStretchRequest, SpaceObjectsRequest, UserRequest, ImportRequest, \
+    NumSbrosRequest, ExportRequest, FollowTheSunRequest, GlueStretchRequest, SettingsRequest
+from api_pinger.pinger import headers, url_login, url_stretches, url_stretch_edit, url_stretch_delete, \
+    url_frames, url_sbis, url_do_stretch, url_space_objects, url_user, url_import, url_num_sbros, url_export, \
+    url_follow_the_sun, url_glue_stretch, url_settings, api_session
+from api_pinger.client_session import ApiSession
+from api_pinger.load_driver import latency_to_bucket, merge_results
+
+
+# конечные точки API, доступные в сценариях: имя -> (url, модель запроса для проверки параметров)
+endpoints = {
+    'login': (url_login, LoginRequest),
+    'stretches': (url_stretches, StretchesRequest),
+    'stretch_edit': (url_stretch_edit, StretchEditRequest),
+    'stretch_delete': (url_stretch_delete, StretchDeleteRequest),
+    'frames': (url_frames, FramesRequest),
+    'sbis': (url_sbis, SbisRequest),
+    'do_stretch': (url_do_stretch, DoStretchRequest),
+    'space_objects': (url_space_objects, SpaceObjectsRequest),
+    'user': (url_user, UserRequest),
+    'import': (url_import, ImportRequest),
+    'num_sbros': (url_num_sbros, NumSbrosRequest),
+    'export': (url_export, ExportRequest),
+    'follow_the_sun': (url_follow_the_sun, FollowTheSunRequest),
+    'glue_stretch': (url_glue_stretch, GlueStretchRequest),
+    'settings': (url_settings, SettingsRequest),
+}
+
+
+class ScenarioRequest(BaseModel):
+    """
+    Описание запроса в сценарии: конечная точка, относительный вес в смеси и шаблон параметров
+    """
+    endpoint: str
+    weight: float = 1
+    params: dict
+
+
+class Scenario(BaseModel):
+    """
+    Описание сценария нагрузки
+    """
+    # общая длительность воспроизведения, с
+    duration_s: float
+    # время, за которое запускаются все виртуальные пользователи, с
+    ramp_up_s: float = 0
+    # число виртуальных пользователей
+    users: int = 1
+    # пауза между запросами одного пользователя: [мин, макс], с
+    think_time_s: conlist(NonNegativeFloat, min_items=2, max_items=2) = [0, 0]
+    # именованные наборы значений для подстановки "$pool:<имя>"
+    pools: Dict[str, list] = {}
+    requests: List[ScenarioRequest]
+
+    # noinspection PyMethodParameters
+    @validator('think_time_s')
+    def _validate_think_time(cls, val: list):
+        if val[0] > val[1]:
+            raise ValueError('Минимальная пауза больше максимальной')
+        return val
+
+
+def render(template, scenario: Scenario, token: str):
+    """
+    Подставляет случайные значения в шаблон параметров запроса. Поддерживаются:
+    "$token" - токен, полученный при логине; "$pool:<имя>" - случайное значение из набора pools;
+    "$now" - текущее время UTC в формате ISO; {"$choice": [...]} - случайный элемент списка;
+    {"$randint": [a, b]} - случайное целое из [a, b]; {"$uniform": [a, b]} - случайное вещественное из [a, b];
+    {"$now_offset_s": [a, b]} - текущее время UTC, смещенное на случайное число секунд из [a, b]
+    """
+    if isinstance(template, str):
+        if template == '$token':
+            return token
+        if template == '$now':
+            return datetime.now(pytz.utc).isoformat()
+        if template.startswith('$pool:'):
+            return random.choice(scenario.pools[template[len('$pool:'):]])
+        return template
+    if isinstance(template, list):
+        return [render(item, scenario, token) for item in template]
+    if isinstance(template, dict):
+        if len(template) == 1:
+            (key, value), = template.items()
+            if key == '$choice':
+                return render(random.choice(value), scenario, token)
+            if key == '$randint':
+                return random.randint(*value)
+            if key == '$uniform':
+                return random.uniform(*value)
+            if key == '$now_offset_s':
+                return (datetime.now(pytz.utc) + timedelta(seconds=random.uniform(*value))).isoformat()
+        return {key: render(value, scenario, token) for key, value in template.items()}
+    return template
+
+
+def _pool_references(template) -> list:
+    """
+    Возвращает имена наборов значений, на которые ссылается шаблон через "$pool:<имя>"
+    """
+    if isinstance(template, str):
+        return [template[len('$pool:'):]] if template.startswith('$pool:') else []
+    if isinstance(template, list):
+        return [name for item in template for name in _pool_references(item)]
+    if isinstance(template, dict):
+        return [name for item in template.values() for name in _pool_references(item)]
+    return []
+
+
+def load_scenario(path: str) -> Scenario:
+    """
+    Загружает сценарий из JSON-файла и проверяет, что все конечные точки и наборы значений известны
+    """
+    with open(path, encoding='utf-8') as file:
+        scenario = Scenario.parse_obj(json.load(file))
+    for item in scenario.requests:
+        if item.endpoint not in endpoints:
+            raise ValueError(f'Конечная точка "{item.endpoint}" не найдена в справочнике')
+        for name in _pool_references(item.params):
+            if not scenario.pools.get(name):
+                raise ValueError(f'Набор значений "{name}" для "{item.endpoint}" не найден или пуст')
+    return scenario
+
+
+def _virtual_user(scenario: Scenario, session: requests.Session, token: str, start_delay_s: float,
+                  stop_time: float, results: dict, lock: threading.Lock) -> None:
+    """
+    Виртуальный пользователь: выбирает запросы согласно весам, проверяет параметры по модели запроса,
+    посылает их и собирает статистику по конечным точкам в results
+    """
+    time.sleep(start_delay_s)
+    weights = [item.weight for item in scenario.requests]
+    while time.perf_counter() < stop_time:
+        item = random.choices(scenario.requests, weights)[0]
+        url, request_model = endpoints[item.endpoint]
+
+        latency_bucket = None
+        error = None
+        invalid = None
+        try:
+            params = render(item.params, scenario, token)
+            request_model.parse_obj(params)
+        except ValidationError:
+            invalid = 'Параметры не прошли проверку'
+        except (KeyError, IndexError, TypeError, ValueError):
+            invalid = 'Ошибка подстановки шаблона'
+        else:
+            request_start = time.perf_counter()
+            try:
+                response = session.post(url, verify=False, data=json.dumps(params), headers=headers)
+                latency_bucket = latency_to_bucket((time.perf_counter() - request_start) * 1000)
+                if response.status_code != 200:
+                    error = f'HTTP {response.status_code}'
+                elif response.json().get('errors'):
+                    error = 'Ошибка в ответе сервера'
+            except requests.RequestException as exc:
+                error = type(exc).__name__
+            except (ValueError, AttributeError):
+                error = 'Некорректный ответ сервера'
+
+        with lock:
+            result = results[item.endpoint]
+            # запросы, не прошедшие проверку, не отправляются и не учитываются в пропускной способности
+            if invalid is not None:
+                result['invalid'][invalid] += 1
+            else:
+                result['sent'] += 1
+            if latency_bucket is not None:
+                result['histogram'][latency_bucket] += 1
+            if error is not None:
+                result['errors'][error] += 1
+
+        time.sleep(random.uniform(*scenario.think_time_s))
+
+
+def run_scenario(scenario: Scenario, api_session: ApiSession) -> dict:
+    """
+    Воспроизводит сценарий и возвращает отчет по каждой конечной точке.
+    Логин выполняется один раз через api_session, полученный токен подставляется вместо "$token"
+    """
+    token = api_session.ensure_token()
+    session = requests.Session()
+    # каждому виртуальному пользователю - свое соединение, чтобы не терять их при переполнении пула
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=scenario.users)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    results = {item.endpoint: {'sent': 0, 'elapsed_s': scenario.duration_s,
+                               'histogram': Counter(), 'errors': Counter(), 'invalid': Counter()}
+               for item in scenario.requests}
+    lock = threading.Lock()
+
+    start = time.perf_counter()
+    stop_time = start + scenario.duration_s
+    users = [threading.Thread(target=_virtual_user,
+                              args=(scenario, session, token, scenario.ramp_up_s * i / scenario.users,
+                                    stop_time, results, lock),
+                              daemon=True)
+             for i in range(scenario.users)]
+    for user in users:
+        user.start()
+    for user in users:
+        user.join()
+    session.close()
+
+    return {endpoint: dict(merge_results([result]), invalid=dict(result['invalid']))
+            for endpoint, result in results.items()}
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Воспроизведение сценария нагрузки на API-сервер')
+    parser.add_argument('scenario', help='путь к JSON-файлу сценария')
+    args = parser.parse_args()
+
+    report = run_scenario(load_scenario(args.scenario), api_session)
+    print('Отчет о воспроизведении сценария:')
+    print(json.dumps(report, sort_keys=False, indent=4, ensure_ascii=False))
@@ -0,0 +1,77 @@
+import json
+import time
+from typing import Tuple
+
+import requests
+
+from common_dataclasses import stretch_event_models, DoStretchRequest
+from api_pinger.pinger import api_session, url_do_stretch_stream, params_do_stretch
+
+
+# таймауты потокового запроса по умолчанию: (установка соединения, ожидание очередного фрагмента ответа), с
+default_stream_timeout_s = (10, 300)
+
+
+def consume_do_stretch_stream(url: str, params: dict,
+                              timeout: Tuple[float, float] = default_stream_timeout_s) -> dict:
+    """
+    Посылает запрос на создание протяжки с потоковым ответом (JSON-события, разделенные переводом строки),
+    разбирает события и возвращает время до первого события, время до первого вектора состояния,
+    общее время расчета, итоговый результат и число пропущенных некорректных строк.
+    Обрыв или таймаут потока не отменяет уже собранные измерения, ошибка возвращается в поле error
+    """
+    DoStretchRequest.parse_obj(dict(params, token=api_session.ensure_token()))
+
+    start = time.perf_counter()
+    time_to_first_event_s = None
+    time_to_first_vector_s = None
+    vectors = 0
+    skipped_lines = 0
+    result = None
+    error = None
+
+    try:
+        with api_session.post(url, params, stream=True, timeout=timeout) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                # некорректные строки и неизвестные типы событий пропускаются,
+                # чтобы протокол можно было расширять
+                try:
+                    data = json.loads(line)
+                    event_model = stretch_event_models.get(data.get('event'))
+                    if event_model is None:
+                        continue
+                    event = event_model.parse_obj(data)
+                except (ValueError, AttributeError):
+                    skipped_lines += 1
+                    continue
+                elapsed_s = time.perf_counter() - start
+                if time_to_first_event_s is None:
+                    time_to_first_event_s = elapsed_s
+
+                if event.event == 'progress':
+                    print(f'{event.progress_percent:.1f}% - рассчитано до {event.propagated_up_to.isoformat()}')
+                elif event.event == 'batch':
+                    if time_to_first_vector_s is None and event.status_vectors:
+                        time_to_first_vector_s = elapsed_s
+                    vectors += len(event.status_vectors)
+                elif event.event == 'result':
+                    result = event.result
+    except requests.RequestException as exc:
+        error = str(exc)
+
+    return {'time_to_first_event_s': time_to_first_event_s,
+            'time_to_first_vector_s': time_to_first_vector_s,
+            'total_time_s': time.perf_counter() - start,
+            'vectors': vectors,
+            'skipped_lines': skipped_lines,
+            'result': result.dict() if result is not None else None,
+            'error': error}
+
+
+if __name__ == '__main__':
+    report = consume_do_stretch_stream(url_do_stretch_stream, params_do_stretch)
+    print('Отчет о потоковом расчете протяжки:')
+    print(json.dumps(report, sort_keys=False, indent=4, ensure_ascii=False, default=str))
@@ -0,0 +1,233 @@
+import json
+import time
+import itertools
+import argparse
+from typing import Optional
+
+import requests
+
+from common_dataclasses import DoStretchRequest, GlueStretchRequest, DoStretchResult, GlueStretchResult, \
+    SbisResult
+from api_pinger.pinger import api_session, url_do_stretch, url_glue_stretch, url_sbis, url_stretch_delete, \
+    params_do_stretch, params_glue_stretch
+from api_pinger.client_session import ApiSession
+
+
+# сетка параметров протяжки по умолчанию; пары (f81, kp) перебираются совместно
+default_grid = {
+    'period': [93 * 60, 5 * 93 * 60, 10 * 93 * 60],
+    'timestep': [10, 30, 60],
+    'revolution_number': [None],
+    'ascending_nodes_only': [False, True],
+    'f81_kp': [(0, 0), (125, 1.6)],
+    'is_multiprocess_mode': [False, True],
+}
+
+# параметры сетки, отсутствующие в GlueStretchRequest
+glue_stretch_excluded_keys = ('revolution_number', 'ascending_nodes_only')
+
+# параметры базовой протяжки, к которой выполняется склейка в режиме glue_stretch (один виток)
+glue_stretch_base_params = {
+    'period': 93 * 60,
+    'timestep': 60,
+    'ascending_nodes_only': False,
+    'is_multiprocess_mode': False,
+}
+
+# таймаут одного HTTP-запроса, с
+default_request_timeout_s = 3600
+
+
+def _post(session: ApiSession, url: str, params: dict, timeout: float) -> dict:
+    response = session.post(url, params, timeout=timeout)
+    response.raise_for_status()
+    return response.json()
+
+
+def _sbi_count(session: ApiSession, stretch_id: int, timeout: float) -> int:
+    """
+    Возвращает число СБИ в протяжке stretch_id
+    """
+    result = SbisResult.parse_obj(_post(session, url_sbis, {'stretch_id': stretch_id}, timeout))
+    return len(result.sbis)
+
+
+def _delete_stretch(session: ApiSession, stretch_id: int, timeout: float) -> None:
+    """
+    Удаляет протяжку, созданную при измерении; ошибка удаления не должна отменять измерение
+    """
+    try:
+        _post(session, url_stretch_delete, {'stretch_id': stretch_id}, timeout)
+    except (requests.RequestException, ValueError) as exc:
+        print(f'Не удалось удалить протяжку {stretch_id}: {exc}')
+
+
+def _create_stretch(session: ApiSession, params: dict, timeout: float) -> DoStretchResult:
+    DoStretchRequest.parse_obj(dict(params, token=session.ensure_token()))
+    return DoStretchResult.parse_obj(_post(session, url_do_stretch, params, timeout))
+
+
+def grid_points(grid: dict) -> list:
+    """
+    Возвращает список всех комбинаций параметров сетки в виде словарей
+    """
+    keys = list(grid)
+    points = []
+    for values in itertools.product(*(grid[key] for key in keys)):
+        point = dict(zip(keys, values))
+        point['f81'], point['kp'] = point.pop('f81_kp')
+        points.append(point)
+    return points
+
+
+def measure_do_stretch(session: ApiSession, point: dict, timeout: float = default_request_timeout_s) -> dict:
+    """
+    Выполняет протяжку с параметрами point и возвращает время расчета и число полученных векторов.
+    Созданная протяжка удаляется
+    """
+    params = dict(params_do_stretch, **point)
+    params['stretch'] = dict(params_do_stretch['stretch'], name=f'Протяжка из sweep {point}')
+
+    start = time.perf_counter()
+    result = _create_stretch(session, params, timeout)
+    elapsed_s = time.perf_counter() - start
+
+    measurement = dict(point, elapsed_s=elapsed_s, status=result.status, errors=result.errors, vectors=None)
+    if result.status == 'passed':
+        try:
+            measurement['vectors'] = _sbi_count(session, result.stretch_id, timeout)
+        finally:
+            _delete_stretch(session, result.stretch_id, timeout)
+    return measurement
+
+
+def measure_glue_stretch(session: ApiSession, point: dict, timeout: float = default_request_timeout_s) -> dict:
+    """
+    Выполняет склейку с параметрами point для новой базовой протяжки и возвращает время расчета
+    и число добавленных векторов. Базовая протяжка создается заново для каждого измерения,
+    чтобы все точки сетки выполнялись из одинакового начального состояния, и затем удаляется
+    """
+    base_params = dict(params_do_stretch, **glue_stretch_base_params)
+    base_params['stretch'] = dict(params_do_stretch['stretch'], name=f'Базовая протяжка из sweep {point}')
+    base = _create_stretch(session, base_params, timeout)
+    if base.status != 'passed':
+        return dict(point, elapsed_s=None, status='failed', errors=base.errors, vectors=None)
+
+    try:
+        params = dict(params_glue_stretch, stretch_id=base.stretch_id, **point)
+        GlueStretchRequest.parse_obj(dict(params, token=session.ensure_token()))
+
+        vectors_before = _sbi_count(session, base.stretch_id, timeout)
+        start = time.perf_counter()
+        result = GlueStretchResult.parse_obj(_post(session, url_glue_stretch, params, timeout))
+        elapsed_s = time.perf_counter() - start
+
+        measurement = dict(point, elapsed_s=elapsed_s, status=result.status, errors=result.errors, vectors=None)
+        if result.status == 'passed':
+            measurement['vectors'] = _sbi_count(session, base.stretch_id, timeout) - vectors_before
+    finally:
+        _delete_stretch(session, base.stretch_id, timeout)
+    return measurement
+
+
+def _fit_line(xs: list, ys: list) -> Optional[dict]:
+    """
+    Аппроксимирует зависимость y = intercept + slope * x методом наименьших квадратов
+    """
+    n = len(xs)
+    if n < 2:
+        return None
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    variance_x = sum((x - mean_x) ** 2 for x in xs)
+    if variance_x == 0:
+        return None
+    slope = sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance_x
+    return {'intercept_s': mean_y - slope * mean_x, 'slope_s': slope}
+
+
+def fit_cost_model(measurements: list) -> dict:
+    """
+    Строит модель стоимости расчета: время на один рассчитанный шаг интегрирования (period / timestep)
+    для однопроцессного и многопроцессного режимов и ускорение многопроцессного режима
+    """
+    model = {}
+    for is_multiprocess_mode in (False, True):
+        passed = [item for item in measurements
+                  if item['status'] == 'passed' and item['is_multiprocess_mode'] == is_multiprocess_mode]
+        steps = [item['period'] / item['timestep'] for item in passed]
+        fit = _fit_line(steps, [item['elapsed_s'] for item in passed])
+        model['multiprocess' if is_multiprocess_mode else 'single_process'] = {
+            'measurements': len(passed),
+            'time_per_step_s': fit['slope_s'] if fit else None,
+            'overhead_s': fit['intercept_s'] if fit else None,
+            'vectors_per_step': sum(item['vectors'] for item in passed) / sum(steps) if steps else None,
+        }
+
+    single = model['single_process']['time_per_step_s']
+    multi = model['multiprocess']['time_per_step_s']
+    model['multiprocess_speedup'] = single / multi if single and multi else None
+    if single and multi and multi < single:
+        # многопроцессный режим выгоден, когда экономия на шагах перекрывает его накладные расходы
+        overhead = model['multiprocess']['overhead_s'] - model['single_process']['overhead_s']
+        model['multiprocess_break_even_steps'] = max(overhead, 0) / (single - multi)
+    else:
+        model['multiprocess_break_even_steps'] = None
+    return model
+
+
+def _write_report(report: dict, output: str) -> None:
+    with open(output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, sort_keys=False, indent=4, ensure_ascii=False)
+
+
+def run_sweep(grid: dict, mode: str = 'do_stretch', repeats: int = 1, output: Optional[str] = None,
+              session: Optional[ApiSession] = None, timeout: float = default_request_timeout_s) -> dict:
+    """
+    Прогоняет сетку параметров grid через do_stretch или glue_stretch (mode) с таймаутом timeout (с)
+    на каждый запрос и возвращает отчет с измерениями и моделью стоимости. Если задан output, отчет перезаписывается
+    после каждого измерения, чтобы при прерывании прогона полученные результаты не терялись
+    """
+    if mode == 'glue_stretch':
+        # склейка не принимает эти параметры, повторять по ним точки сетки бессмысленно
+        grid = {key: values for key, values in grid.items() if key not in glue_stretch_excluded_keys}
+
+    session = session or api_session
+    report = {'mode': mode, 'measurements': [], 'cost_model': None}
+    for point in grid_points(grid):
+        for _ in range(repeats):
+            try:
+                if mode == 'glue_stretch':
+                    measurement = measure_glue_stretch(session, point, timeout)
+                else:
+                    measurement = measure_do_stretch(session, point, timeout)
+            except (requests.RequestException, ValueError) as exc:
+                # ValidationError моделей запросов и ответов также является ValueError
+                measurement = dict(point, elapsed_s=None, status='failed', errors=[str(exc)], vectors=None)
+            print(measurement)
+            report['measurements'].append(measurement)
+            report['cost_model'] = fit_cost_model(report['measurements'])
+            if output:
+                _write_report(report, output)
+
+    return report
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Построение модели стоимости расчета протяжек')
+    parser.add_argument('--mode', choices=['do_stretch', 'glue_stretch'], default='do_stretch')
+    parser.add_argument('--repeats', type=int, default=1, help='число повторов каждой точки сетки')
+    parser.add_argument('--timeout', type=float, default=default_request_timeout_s, help='таймаут одного запроса, с')
+    parser.add_argument('--grid', help='JSON-файл с сеткой параметров (по умолчанию - default_grid)')
+    parser.add_argument('--output', default='sweep_report.json', help='файл отчета')
+    args = parser.parse_args()
+
+    if args.grid:
+        with open(args.grid, encoding='utf-8') as file:
+            sweep_grid = json.load(file)
+    else:
+        sweep_grid = default_grid
+    sweep_report = run_sweep(sweep_grid, args.mode, args.repeats, args.output, timeout=args.timeout)
+
+    print('Модель стоимости расчета:')
+    print(json.dumps(sweep_report['cost_model'], sort_keys=False, indent=4, ensure_ascii=False))
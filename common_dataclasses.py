@@ -1,7 +1,8 @@
 import math
-from pydantic import BaseModel, validator, PositiveInt, constr, PositiveFloat, NonNegativeFloat, NonNegativeInt
+from pydantic import BaseModel, validator, PositiveInt, constr, PositiveFloat, NonNegativeFloat, NonNegativeInt, \
+    confloat
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Literal
 import pytz
 
 # точность округления значений расстояний, м
@@ -247,6 +248,8 @@ class Stretch(BaseModel):
     begin_time: Optional[datetime]
     end_time: Optional[datetime]
     creation_time: Optional[datetime]
+    # версия набора СБИ протяжки, увеличивается при каждом изменении СБИ (склейке, удалении)
+    version: Optional[NonNegativeInt]
     comment: Optional[str]
 
     # noinspection PyMethodParameters
@@ -347,6 +350,8 @@ class SbisRequest(BaseModel):
     """
     token: str
     stretch_id: int
+    # версия СБИ протяжки, известная клиенту; если задана, возвращаются только изменения после нее
+    since_version: Optional[NonNegativeInt]
 
 
 class SbisResult(BaseModel):
@@ -354,6 +359,12 @@ class SbisResult(BaseModel):
     Класс данных для ответа на запрос списка СБИ
     """
     sbis: List[StandardBallisticInformation]
+    # текущая версия СБИ протяжки
+    version: Optional[NonNegativeInt]
+    # True - в sbis только новые и измененные СБИ после since_version, False - полный список
+    is_delta: bool = False
+    # идентификаторы векторов состояния удаленных СБИ (только при is_delta)
+    deleted_status_vector_ids: Optional[List[int]]
     errors: Optional[list]
 
 
@@ -382,6 +393,47 @@ class DoStretchResult(BaseModel):
     errors: Optional[list]
 
 
+class StretchProgressEvent(BaseModel):
+    """
+    Класс данных для события потокового ответа о ходе расчета протяжки
+    """
+    event: Literal['progress'] = 'progress'
+    # доля выполненного расчета, %
+    progress_percent: confloat(ge=0, le=100)
+    # момент времени, до которого выполнено интегрирование
+    propagated_up_to: datetime
+
+    # noinspection PyMethodParameters
+    @validator('propagated_up_to')
+    def _time_to_utc(cls, val: datetime):
+        result = datetime(val.year, val.month, val.day, val.hour, val.minute, val.second, val.microsecond, pytz.utc)
+        return result
+
+
+class StretchBatchEvent(BaseModel):
+    """
+    Класс данных для события потокового ответа с очередной порцией рассчитанных векторов состояния
+    """
+    event: Literal['batch'] = 'batch'
+    status_vectors: List[StatusVector]
+
+
+class DoStretchResultEvent(BaseModel):
+    """
+    Класс данных для завершающего события потокового ответа на запрос на создание протяжки
+    """
+    event: Literal['result'] = 'result'
+    result: DoStretchResult
+
+
+# соответствие типа события потокового ответа (поле event) классу данных
+stretch_event_models = {
+    'progress': StretchProgressEvent,
+    'batch': StretchBatchEvent,
+    'result': DoStretchResultEvent,
+}
+
+
 class GlueStretchRequest(BaseModel):
     """
     Класс данных для запроса на склейку протяжки